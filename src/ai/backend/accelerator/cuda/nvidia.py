@@ -1,12 +1,13 @@
 from abc import ABCMeta, abstractmethod
 import ctypes
 from typing import (
-    Any, Union,
-    Tuple, NamedTuple,
+    Any, Optional, Union,
+    Dict, List, Tuple, NamedTuple,
     MutableMapping,
     Type,
 )
 import platform
+import sys
 
 
 # ref: https://developer.nvidia.com/cuda-toolkit-archive
@@ -392,8 +393,8 @@ class libcudart(LibraryBase):
         pci_bus_id = b' ' * 16
         cls.invoke('cudaDeviceGetPCIBusId',
                    ctypes.c_char_p(pci_bus_id), 16, device_idx)
-        props['name'] = props['name'].decode()
-        props['pciBusID_str'] = pci_bus_id.split(b'\x00')[0].decode()
+        props['name'] = sys.intern(props['name'].decode())
+        props['pciBusID_str'] = sys.intern(pci_bus_id.split(b'\x00')[0].decode())
         if 'uuid' in props:
             props['uuid'] = bytes(props['uuid'])
         if 'luid' in props:
@@ -430,9 +431,36 @@ class nvmlProcessInfo_t(ctypes.Structure):
     ]
 
 
+class nvmlValue_t(ctypes.Union):
+    _fields_ = [
+        ('dVal', ctypes.c_double),
+        ('uiVal', ctypes.c_uint),
+        ('ulVal', ctypes.c_ulong),
+        ('ullVal', ctypes.c_ulonglong),
+        ('sllVal', ctypes.c_longlong),
+        ('siVal', ctypes.c_int),
+    ]
+
+
+class nvmlSample_t(ctypes.Structure):
+    _fields_ = [
+        ('timeStamp', ctypes.c_ulonglong),
+        ('sampleValue', nvmlValue_t),
+    ]
+
+
 NVML_INIT_FLAG_NO_GPUS = 1    # allow init without GPUs
 NVML_INIT_FLAG_NO_ATTACH = 2  # do not attach the GPUs on init
 
+NVML_ERROR_NOT_SUPPORTED = 3
+NVML_ERROR_NOT_FOUND = 6
+NVML_ERROR_INSUFFICIENT_SIZE = 7
+
+NVML_GPU_UTILIZATION_SAMPLES = 1
+
+# indexed by nvmlValueType_t
+NVML_VALUE_FIELDS = ('dVal', 'uiVal', 'ulVal', 'ullVal', 'sllVal', 'siVal')
+
 
 class DeviceStat(NamedTuple):
     device_idx: int
@@ -448,6 +476,7 @@ class libnvml(LibraryBase):
     name = 'NVML'
 
     _initialized = False
+    _sample_buffer_sizes: Dict[int, int] = {}
 
     @classmethod
     def load_library(cls):
@@ -496,25 +525,111 @@ class libnvml(LibraryBase):
         return count.value
 
     @classmethod
-    def get_device_stats(cls, device_idx: int) -> DeviceStat:
+    def get_device_handle(cls, device_idx: int) -> ctypes.c_void_p:
         '''
-        Returns the current usage information of the given CUDA device.
+        Returns the NVML handle of the given CUDA device, which can be reused
+        across subsequent queries.
         '''
         cls.ensure_init()
         handle = ctypes.c_void_p()
-        mem_info = nvmlMemoryInfo_t()
-        util_info = nvmlUtilization_t()
         cls.invoke('nvmlDeviceGetHandleByIndex_v2',
                    device_idx, ctypes.byref(handle))
+        return handle
+
+    @classmethod
+    def get_device_memory_info(cls, handle: ctypes.c_void_p) -> Tuple[int, int, int]:
+        '''
+        Returns the total, used and free memory of the given device in bytes.
+        '''
+        cls.ensure_init()
+        mem_info = nvmlMemoryInfo_t()
         cls.invoke('nvmlDeviceGetMemoryInfo',
                    handle, ctypes.byref(mem_info))
+        return mem_info.total, mem_info.used, mem_info.free
+
+    @classmethod
+    def get_device_utilization(cls, handle: ctypes.c_void_p) -> Tuple[int, int]:
+        '''
+        Returns the current GPU core and memory I/O utilization of the given
+        device in percent.
+        '''
+        cls.ensure_init()
+        util_info = nvmlUtilization_t()
         cls.invoke('nvmlDeviceGetUtilizationRates',
                    handle, ctypes.byref(util_info))
+        return util_info.gpu, util_info.memory
+
+    @classmethod
+    def get_device_stats(
+        cls,
+        device_idx: int,
+        handle: Optional[ctypes.c_void_p] = None,
+    ) -> DeviceStat:
+        '''
+        Returns the current usage information of the given CUDA device.
+        '''
+        if handle is None:
+            handle = cls.get_device_handle(device_idx)
+        mem_total, mem_used, mem_free = cls.get_device_memory_info(handle)
+        gpu_util, mem_util = cls.get_device_utilization(handle)
         return DeviceStat(
             device_idx=device_idx,
-            mem_total=mem_info.total,
-            mem_used=mem_info.used,
-            mem_free=mem_info.free,
-            gpu_util=util_info.gpu,
-            mem_util=util_info.memory,
+            mem_total=mem_total,
+            mem_used=mem_used,
+            mem_free=mem_free,
+            gpu_util=gpu_util,
+            mem_util=mem_util,
         )
+
+    @classmethod
+    def get_device_util_samples(
+        cls,
+        handle: ctypes.c_void_p,
+        last_seen_ts: int = 0,
+    ) -> List[Tuple[int, int]]:
+        '''
+        Returns the GPU utilization samples of the given device recorded by the
+        driver after the given timestamp, as a list of (timestamp, percent) pairs.
+        It raises LibraryError with NVML_ERROR_NOT_SUPPORTED if the device does
+        not support sampling.
+        '''
+        cls.ensure_init()
+        value_type = ctypes.c_int()
+        buffer_size = cls._sample_buffer_sizes.get(handle.value)
+        if buffer_size is None:
+            # The driver's sample buffer size is fixed, so query it only once.
+            count = ctypes.c_uint()
+            rc = cls.invoke('nvmlDeviceGetSamples',
+                            handle, NVML_GPU_UTILIZATION_SAMPLES,
+                            ctypes.c_ulonglong(last_seen_ts),
+                            ctypes.byref(value_type), ctypes.byref(count), None,
+                            check_rc=False)
+            if rc == NVML_ERROR_NOT_FOUND:
+                return []
+            if rc != 0:
+                raise LibraryError(cls.name, 'nvmlDeviceGetSamples', rc)
+            buffer_size = count.value
+            cls._sample_buffer_sizes[handle.value] = buffer_size
+        count = ctypes.c_uint(buffer_size)
+        samples = (nvmlSample_t * buffer_size)()
+        rc = cls.invoke('nvmlDeviceGetSamples',
+                        handle, NVML_GPU_UTILIZATION_SAMPLES,
+                        ctypes.c_ulonglong(last_seen_ts),
+                        ctypes.byref(value_type), ctypes.byref(count), samples,
+                        check_rc=False)
+        if rc == NVML_ERROR_NOT_FOUND:
+            return []
+        if rc == NVML_ERROR_INSUFFICIENT_SIZE:
+            # Re-query the buffer size on the next call.
+            del cls._sample_buffer_sizes[handle.value]
+            return []
+        if rc != 0:
+            raise LibraryError(cls.name, 'nvmlDeviceGetSamples', rc)
+        if not 0 <= value_type.value < len(NVML_VALUE_FIELDS):
+            # Treat unknown value types from newer drivers as unsupported sampling.
+            raise LibraryError(cls.name, 'nvmlDeviceGetSamples', NVML_ERROR_NOT_SUPPORTED)
+        value_field = NVML_VALUE_FIELDS[value_type.value]
+        return [
+            (sample.timeStamp, getattr(sample.sampleValue, value_field))
+            for sample in samples[:count.value]
+        ]
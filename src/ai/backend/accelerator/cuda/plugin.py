@@ -1,14 +1,19 @@
 import asyncio
 from decimal import Decimal
+import fcntl
 import json
 import logging
+import os
 from pathlib import Path
 from pprint import pformat
 import re
+import shutil
+import time
 from typing import (
     Any,
     Collection,
     Dict,
+    IO,
     List,
     Mapping,
     MutableMapping,
@@ -46,7 +51,7 @@ from ai.backend.common.types import (
     SlotName, SlotTypes,
 )
 from . import __version__
-from .nvidia import libcudart, libnvml, LibraryError
+from .nvidia import libcudart, libnvml, LibraryError, NVML_ERROR_NOT_SUPPORTED
 
 __all__ = (
     'PREFIX',
@@ -58,6 +63,147 @@ PREFIX = 'cuda'
 
 log = BraceStyleAdapter(logging.getLogger('ai.backend.accelerator.cuda'))
 
+NVDOCKER_VERSION_CACHE_PATH = '/var/run/backend.ai/nvdocker_version'
+DOCKER_SOCKET_PATH = '/var/run/docker.sock'
+
+_DEV_CUDA = DeviceName('cuda')
+_SLOT_CUDA_DEVICE = SlotName('cuda.device')
+_SLOT_CUDA_DEVICES = SlotName('cuda.devices')
+
+_NULL_UUID = '00000000-0000-0000-0000-000000000000'
+_DEC_100 = Decimal(100)
+
+_RX_TRIPLE_VERSION = re.compile(r'(\d+)\.(\d+)\.(\d+)')
+_RX_NVDOCKER_VER = re.compile(r'^NVIDIA Docker: (\d+)\.(\d+)\.(\d+)')
+_RX_NVIDIA_DEV = re.compile(r'^/dev/nvidia(\d+)$')
+
+
+def _read_pci_numa_node(bus_id: str) -> Optional[int]:
+    sysfs_node_path = f"/sys/bus/pci/devices/{bus_id.lower()}/numa_node"
+    try:
+        return int(Path(sysfs_node_path).read_text().strip())
+    except OSError:
+        return None
+
+
+def _numa_node_sort_key(numa_node: Optional[int]) -> int:
+    # Group the devices with unknown NUMA nodes together in front.
+    return -1 if numa_node is None else numa_node
+
+
+def _format_numa_node(numa_node: Optional[int]) -> str:
+    # Like sysfs, we use -1 for unknown NUMA nodes (e.g., on non-NUMA hosts).
+    # It is not a valid node ID for numactl, so consumers must skip it.
+    if numa_node is None or numa_node < 0:
+        return '-1'
+    return str(numa_node)
+
+
+def _get_nvdocker_version_cache_key() -> Optional[str]:
+    '''
+    Returns a key that changes whenever the host reboots, nvidia-docker or docker
+    is (re)installed, or the docker daemon restarts (recreating its socket).
+    It returns None if nvidia-docker is not installed.
+    '''
+    nvdocker_path = shutil.which('nvidia-docker')
+    if nvdocker_path is None:
+        return None
+    try:
+        boot_id = Path('/proc/sys/kernel/random/boot_id').read_text().strip()
+    except OSError:
+        boot_id = '-'
+    key_items = [boot_id]
+    # Package managers preserve mtime but replace the files (new inode and ctime).
+    for path in (nvdocker_path, shutil.which('docker'), DOCKER_SOCKET_PATH):
+        try:
+            st = os.stat(path) if path is not None else None
+        except OSError:
+            st = None
+        key_items.append(f'{st.st_ino}:{st.st_ctime_ns}' if st is not None else '-')
+    return ' '.join(key_items)
+
+
+def _read_nvdocker_version_lines(f: IO[str], cache_key: str) -> Optional[List[str]]:
+    f.seek(0)
+    lines = f.read().splitlines()
+    if len(lines) < 3 or lines[0] != cache_key:
+        return None
+    if _RX_NVDOCKER_VER.search(lines[1]) is None:
+        return None
+    return lines[1:3]
+
+
+async def _flock(f: IO[str], operation: int) -> None:
+    # Acquiring the lock may block while another agent is probing the versions.
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(None, fcntl.flock, f.fileno(), operation)
+
+
+async def _probe_nvdocker_version() -> List[str]:
+    proc = await asyncio.create_subprocess_exec(
+        'nvidia-docker', 'version', '-f', '{{json .}}',
+        stdout=asyncio.subprocess.PIPE,
+    )
+    assert proc.stdout is not None
+    lines: List[str] = []
+    # We only need the nvidia-docker version line and the docker version JSON,
+    # so stop collecting as soon as we have them and discard the rest.
+    while len(lines) < 2:
+        line = await proc.stdout.readline()
+        if not line:
+            break
+        lines.append(line.decode().rstrip('\n'))
+    while await proc.stdout.read(4096):
+        pass
+    await proc.wait()
+    return lines
+
+
+async def _read_cached_nvdocker_version(
+    path: str = NVDOCKER_VERSION_CACHE_PATH,
+) -> List[str]:
+    '''
+    Returns the output lines of ``nvidia-docker version``, reusing the result
+    cached by any agent on this host.
+    It runs nvidia-docker only when the cache is missing or stale.
+    '''
+    cache_key = _get_nvdocker_version_cache_key()
+    if cache_key is None:
+        # Let the probe raise FileNotFoundError for the missing nvidia-docker.
+        return await _probe_nvdocker_version()
+    cache_path = Path(path)
+    try:
+        with open(cache_path, 'r') as f:
+            await _flock(f, fcntl.LOCK_SH)
+            try:
+                lines = _read_nvdocker_version_lines(f, cache_key)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        if lines is not None:
+            return lines
+    except OSError:
+        pass
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(cache_path, 'a+')
+    except OSError as e:
+        log.debug('cannot write the nvidia-docker version cache: {!r}', e)
+        return await _probe_nvdocker_version()
+    with f:
+        await _flock(f, fcntl.LOCK_EX)
+        try:
+            # Another agent may have refreshed the cache while we were waiting.
+            lines = _read_nvdocker_version_lines(f, cache_key)
+            if lines is None:
+                lines = await _probe_nvdocker_version()
+                f.seek(0)
+                f.truncate()
+                f.write(''.join(f'{line}\n' for line in [cache_key, *lines[:2]]))
+                f.flush()
+            return lines
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
 
 @attr.s(auto_attribs=True)
 class CUDADevice(AbstractComputeDevice):
@@ -69,9 +215,9 @@ class CUDAPlugin(AbstractComputePlugin):
 
     config_watch_enabled = False
 
-    key = DeviceName('cuda')
+    key = _DEV_CUDA
     slot_types: Sequence[Tuple[SlotName, SlotTypes]] = (
-        (SlotName('cuda.device'), SlotTypes('count')),
+        (_SLOT_CUDA_DEVICE, SlotTypes('count')),
     )
 
     nvdocker_version: Tuple[int, ...] = (0, 0, 0)
@@ -80,33 +226,49 @@ class CUDAPlugin(AbstractComputePlugin):
     device_mask: Sequence[DeviceId] = []
     enabled: bool = True
 
+    _static_device_cache: Optional[List[CUDADevice]] = None
+    _device_by_id: Dict[DeviceId, CUDADevice]
+    _cache_lock: asyncio.Lock
+    _nvml_handles: Dict[DeviceId, Any]
+    _nvml_util_last_ts: Dict[DeviceId, int]
+    _nvml_sampling_unsupported: Set[DeviceId]
+
+    # Older agents do not provide AbstractAllocMap.apply_allocation().
+    # The alloc maps passed to us are always created by create_alloc_map(),
+    # so we can check it once at import time.
+    _apply_allocation_mode: bool = hasattr(DiscretePropertyAllocMap, 'apply_allocation')
+
+    _nvdocker_params_cache: Optional[Tuple[float, Mapping[str, Any]]] = None
+    _nvdocker_cache_ttl: float = 60.0
+    _nvdocker_cache_lock: asyncio.Lock
+
     async def init(self, context: Any = None) -> None:
-        rx_triple_version = re.compile(r'(\d+\.\d+\.\d+)')
+        self._cache_lock = asyncio.Lock()
+        self._device_by_id = {}
+        self._nvdocker_cache_lock = asyncio.Lock()
+        self._nvml_handles = {}
+        self._nvml_util_last_ts = {}
+        self._nvml_sampling_unsupported = set()
         # Check nvidia-docker and docker versions
         try:
-            proc = await asyncio.create_subprocess_exec(
-                'nvidia-docker', 'version', '-f', '{{json .}}',
-                stdout=asyncio.subprocess.PIPE,
-            )
-            stdout, _ = await proc.communicate()
-            lines = stdout.decode().splitlines()
+            lines = await _read_cached_nvdocker_version()
         except FileNotFoundError:
             log.warning('nvidia-docker is not installed.')
             log.info('CUDA acceleration is disabled.')
             self.enabled = False
             return
-        m = rx_triple_version.search(lines[0])
+        m = _RX_NVDOCKER_VER.search(lines[0])
         if m:
-            self.nvdocker_version = tuple(map(int, m.group(1).split('.')))
+            self.nvdocker_version = (int(m[1]), int(m[2]), int(m[3]))
         else:
             log.error('could not detect nvidia-docker version!')
             log.info('CUDA acceleration is disabled.')
             self.enabled = False
             return
         docker_version_data = json.loads(lines[1])
-        m = rx_triple_version.search(docker_version_data['Server']['Version'])
+        m = _RX_TRIPLE_VERSION.search(docker_version_data['Server']['Version'])
         if m:
-            self.docker_version = tuple(map(int, m.group(1).split('.')))
+            self.docker_version = (int(m[1]), int(m[2]), int(m[3]))
         else:
             log.error('could not detect docker version!')
             log.info('CUDA acceleration is disabled.')
@@ -115,9 +277,12 @@ class CUDAPlugin(AbstractComputePlugin):
 
         raw_device_mask = self.plugin_config.get('device_mask')
         if raw_device_mask is not None:
-            self.device_mask = [
+            device_mask = [
                 *map(lambda dev_id: DeviceId(dev_id), raw_device_mask.split(','))
             ]
+            if device_mask != self.device_mask:
+                self.device_mask = device_mask
+                self._static_device_cache = None
         try:
             detected_devices = await self.list_devices()
             log.info('detected devices:\n' + pformat(detected_devices))
@@ -144,24 +309,35 @@ class CUDAPlugin(AbstractComputePlugin):
     async def list_devices(self) -> Collection[CUDADevice]:
         if not self.enabled:
             return []
+        if self._static_device_cache is not None:
+            return self._static_device_cache
+        async with self._cache_lock:
+            # The device topology and static properties do not change at runtime,
+            # so we probe them only once unless the device mask changes.
+            if self._static_device_cache is None:
+                devices = self._probe_static_devices()
+                self._device_by_id = {device.device_id: device for device in devices}
+                self._static_device_cache = devices
+            return self._static_device_cache
+
+    async def _get_device_map(self) -> Mapping[DeviceId, CUDADevice]:
+        # list_devices() populates the device map together with the static cache.
+        await self.list_devices()
+        return self._device_by_id
+
+    def _probe_static_devices(self) -> List[CUDADevice]:
         all_devices = []
         num_devices = libcudart.get_device_count()
         for dev_id in map(lambda idx: DeviceId(str(idx)), range(num_devices)):
             if dev_id in self.device_mask:
                 continue
             raw_info = libcudart.get_device_props(int(dev_id))
-            sysfs_node_path = "/sys/bus/pci/devices/" \
-                              f"{raw_info['pciBusID_str'].lower()}/numa_node"
-            node: Optional[int]
-            try:
-                node = int(Path(sysfs_node_path).read_text().strip())
-            except OSError:
-                node = None
-            dev_uuid, raw_dev_uuid = None, raw_info.get('uuid', None)
+            node = _read_pci_numa_node(raw_info['pciBusID_str'])
+            raw_dev_uuid = raw_info.get('uuid', None)
             if raw_dev_uuid is not None:
                 dev_uuid = str(uuid.UUID(bytes=raw_dev_uuid))
             else:
-                dev_uuid = '00000000-0000-0000-0000-000000000000'
+                dev_uuid = _NULL_UUID
             dev_info = CUDADevice(
                 device_id=dev_id,
                 hw_location=raw_info['pciBusID_str'],
@@ -177,24 +353,25 @@ class CUDAPlugin(AbstractComputePlugin):
     async def available_slots(self) -> Mapping[SlotName, Decimal]:
         devices = await self.list_devices()
         return {
-            SlotName('cuda.device'): Decimal(len(devices)),
+            _SLOT_CUDA_DEVICE: Decimal(len(devices)),
         }
 
     def get_version(self) -> str:
         return __version__
 
     async def extra_info(self) -> Mapping[str, Any]:
-        if self.enabled:
-            try:
-                return {
-                    'cuda_support': True,
-                    'nvidia_version': libnvml.get_driver_version(),
-                    'cuda_version': '{0[0]}.{0[1]}'.format(libcudart.get_version()),
-                }
-            except ImportError:
-                log.warning('extra_info(): NVML/CUDA runtime library is not found')
-            except LibraryError as e:
-                log.warning('extra_info(): {!r}', e)
+        if not self.enabled:
+            return {'cuda_support': False}
+        try:
+            return {
+                'cuda_support': True,
+                'nvidia_version': libnvml.get_driver_version(),
+                'cuda_version': '{0[0]}.{0[1]}'.format(libcudart.get_version()),
+            }
+        except ImportError:
+            log.warning('extra_info(): NVML/CUDA runtime library is not found')
+        except LibraryError as e:
+            log.warning('extra_info(): {!r}', e)
         return {
             'cuda_support': False,
         }
@@ -203,29 +380,37 @@ class CUDAPlugin(AbstractComputePlugin):
         self,
         ctx: StatContext,
     ) -> Sequence[NodeMeasurement]:
+        if not self.enabled:
+            return []
         dev_count = 0
         mem_avail_total = 0
         mem_used_total = 0
         mem_stats = {}
         util_total = 0
         util_stats = {}
-        if self.enabled:
-            try:
-                dev_count = libnvml.get_device_count()
-                for dev_id in map(lambda idx: DeviceId(str(idx)), range(dev_count)):
-                    if dev_id in self.device_mask:
-                        continue
-                    dev_stat = libnvml.get_device_stats(int(dev_id))
-                    mem_avail_total += dev_stat.mem_total
-                    mem_used_total += dev_stat.mem_used
-                    mem_stats[dev_id] = Measurement(Decimal(dev_stat.mem_used),
-                                                    Decimal(dev_stat.mem_total))
-                    util_total += dev_stat.gpu_util
-                    util_stats[dev_id] = Measurement(Decimal(dev_stat.gpu_util), Decimal(100))
-            except ImportError:
-                log.warning('gather_node_measure(): NVML library is not found')
-            except LibraryError as e:
-                log.warning('gather_node_measure(): {!r}', e)
+        try:
+            devices = await self.list_devices()
+            dev_count = len(devices)
+            device_ids = [device.device_id for device in devices]
+            # Initialize NVML before spawning the worker threads
+            # to avoid racing on its initialization.
+            libnvml.ensure_init()
+            loop = asyncio.get_event_loop()
+            dev_stats = await asyncio.gather(*[
+                loop.run_in_executor(None, self._read_device_stat, dev_id)
+                for dev_id in device_ids
+            ])
+            for dev_id, (mem_used, mem_total, gpu_util) in zip(device_ids, dev_stats):
+                mem_avail_total += mem_total
+                mem_used_total += mem_used
+                mem_stats[dev_id] = Measurement(Decimal(mem_used),
+                                                Decimal(mem_total))
+                util_total += gpu_util
+                util_stats[dev_id] = Measurement(Decimal(gpu_util), _DEC_100)
+        except ImportError:
+            log.warning('gather_node_measure(): NVML library is not found')
+        except LibraryError as e:
+            log.warning('gather_node_measure(): {!r}', e)
         return [
             NodeMeasurement(
                 MetricKey('cuda_mem'),
@@ -240,11 +425,42 @@ class CUDAPlugin(AbstractComputePlugin):
                 MetricTypes.USAGE,
                 unit_hint='percent',
                 stats_filter=frozenset({'avg', 'max'}),
-                per_node=Measurement(Decimal(util_total), Decimal(dev_count * 100)),
+                per_node=Measurement(Decimal(util_total), _DEC_100 * dev_count),
                 per_device=util_stats,
             ),
         ]
 
+    def _read_device_stat(self, dev_id: DeviceId) -> Tuple[int, int, int]:
+        '''
+        Returns the used memory, total memory and GPU utilization of the device.
+        It runs in a worker thread.
+        '''
+        handle = self._nvml_handles.get(dev_id)
+        if handle is None:
+            handle = libnvml.get_device_handle(int(dev_id))
+            self._nvml_handles[dev_id] = handle
+        mem_total, mem_used, _ = libnvml.get_device_memory_info(handle)
+        gpu_util: Optional[int] = None
+        if dev_id not in self._nvml_sampling_unsupported:
+            try:
+                samples = libnvml.get_device_util_samples(
+                    handle, self._nvml_util_last_ts.get(dev_id, 0))
+            except LibraryError as e:
+                if e.code != NVML_ERROR_NOT_SUPPORTED:
+                    raise
+                log.info('GPU utilization sampling is not supported '
+                         'for device {}', dev_id)
+                self._nvml_sampling_unsupported.add(dev_id)
+                samples = []
+            if samples:
+                # Use all utilization samples taken since the last tick
+                # instead of a single instantaneous reading.
+                self._nvml_util_last_ts[dev_id] = max(ts for ts, _ in samples)
+                gpu_util = round(sum(util for _, util in samples) / len(samples))
+        if gpu_util is None:
+            gpu_util, _ = libnvml.get_device_utilization(handle)
+        return mem_used, mem_total, gpu_util
+
     async def gather_container_measures(
             self, ctx: StatContext,
             container_ids: Sequence[str],
@@ -253,10 +469,13 @@ class CUDAPlugin(AbstractComputePlugin):
 
     async def create_alloc_map(self) -> AbstractAllocMap:
         devices = await self.list_devices()
+        # Keep the devices on the same NUMA node adjacent so that the discrete
+        # allocation packs multi-GPU containers within a socket where possible.
+        devices = sorted(devices, key=lambda dev: _numa_node_sort_key(dev.numa_node))
         return DiscretePropertyAllocMap(
             device_slots={
                 dev.device_id: (
-                    DeviceSlotInfo(SlotTypes.COUNT, SlotName('cuda.device'), Decimal(1))
+                    DeviceSlotInfo(SlotTypes.COUNT, _SLOT_CUDA_DEVICE, Decimal(1))
                 ) for dev in devices
             },
         )
@@ -277,40 +496,28 @@ class CUDAPlugin(AbstractComputePlugin):
                 if alloc > 0:
                     assigned_device_ids.append(device_id)
         if self.nvdocker_version[0] == 1:
-            timeout = aiohttp.ClientTimeout(total=3)
-            async with aiohttp.ClientSession(raise_for_status=True,
-                                             timeout=timeout) as sess:
-                try:
-                    nvdocker_url = 'http://localhost:3476/docker/cli/json'
-                    async with sess.get(nvdocker_url) as resp:
-                        nvidia_params = await resp.json()
-                except aiohttp.ClientError:
-                    raise RuntimeError('NVIDIA Docker plugin is not available.')
-
+            nvidia_params = await self._get_nvdocker_params()
+            vol_map: Dict[str, Tuple[str, str]] = {
+                vol_name: (mount_pt, permission)
+                for vol_name, mount_pt, permission
+                in (vol_param.split(':') for vol_param in nvidia_params['Volumes'])
+            }
             volumes = await docker.volumes.list()
             existing_volumes = set(vol['Name'] for vol in volumes['Volumes'])
-            required_volumes = set(vol.split(':')[0]
-                                   for vol in nvidia_params['Volumes'])
+            required_volumes = set(vol_map)
             missing_volumes = required_volumes - existing_volumes
-            binds = []
             for vol_name in missing_volumes:
-                for vol_param in nvidia_params['Volumes']:
-                    if vol_param.startswith(vol_name + ':'):
-                        _, _, permission = vol_param.split(':')
-                        driver = nvidia_params['VolumeDriver']
-                        await docker.volumes.create({
-                            'Name': vol_name,
-                            'Driver': driver,
-                        })
-            for vol_name in required_volumes:
-                for vol_param in nvidia_params['Volumes']:
-                    if vol_param.startswith(vol_name + ':'):
-                        _, mount_pt, permission = vol_param.split(':')
-                        binds.append('{}:{}:{}'.format(
-                            vol_name, mount_pt, permission))
+                await docker.volumes.create({
+                    'Name': vol_name,
+                    'Driver': nvidia_params['VolumeDriver'],
+                })
+            binds = [
+                f'{vol_name}:{mount_pt}:{permission}'
+                for vol_name, (mount_pt, permission) in vol_map.items()
+            ]
             devices = []
             for dev in nvidia_params['Devices']:
-                m = re.search(r'^/dev/nvidia(\d+)$', dev)
+                m = _RX_NVIDIA_DEV.search(dev)
                 if m is None:
                     # Always add non-GPU device files required by the driver.
                     # (e.g., nvidiactl, nvidia-uvm, ... etc.)
@@ -363,25 +570,57 @@ class CUDAPlugin(AbstractComputePlugin):
         else:
             raise RuntimeError('BUG: should not be reached here!')
 
+    def _get_cached_nvdocker_params(self) -> Optional[Mapping[str, Any]]:
+        if self._nvdocker_params_cache is None:
+            return None
+        ts, nvidia_params = self._nvdocker_params_cache
+        if time.monotonic() - ts >= self._nvdocker_cache_ttl:
+            return None
+        return nvidia_params
+
+    async def _get_nvdocker_params(self) -> Mapping[str, Any]:
+        # The volumes and devices reported by the nvidia-docker v1 plugin depend
+        # only on the driver state, so we share them across container launches.
+        cached_params = self._get_cached_nvdocker_params()
+        if cached_params is not None:
+            return cached_params
+        async with self._nvdocker_cache_lock:
+            cached_params = self._get_cached_nvdocker_params()
+            if cached_params is not None:
+                return cached_params
+            timeout = aiohttp.ClientTimeout(total=3)
+            async with aiohttp.ClientSession(raise_for_status=True,
+                                             timeout=timeout) as sess:
+                try:
+                    nvdocker_url = 'http://localhost:3476/docker/cli/json'
+                    async with sess.get(nvdocker_url) as resp:
+                        nvidia_params = await resp.json()
+                except aiohttp.ClientError:
+                    raise RuntimeError('NVIDIA Docker plugin is not available.')
+            self._nvdocker_params_cache = (time.monotonic(), nvidia_params)
+            return nvidia_params
+
     async def get_attached_devices(
         self,
         device_alloc: Mapping[SlotName, Mapping[DeviceId, Decimal]],
     ) -> Sequence[DeviceModelInfo]:
         device_ids: List[DeviceId] = []
-        if SlotName('cuda.devices') in device_alloc:
-            device_ids.extend(device_alloc[SlotName('cuda.devices')].keys())
-        available_devices = await self.list_devices()
+        if _SLOT_CUDA_DEVICES in device_alloc:
+            device_ids.extend(device_alloc[_SLOT_CUDA_DEVICES].keys())
+        device_map = await self._get_device_map()
         attached_devices: List[DeviceModelInfo] = []
-        for device in available_devices:
-            if device.device_id in device_ids:
-                proc = device.processing_units
-                mem = BinarySize(device.memory_size)
-                attached_devices.append({  # TODO: update common.types.DeviceModelInfo
-                    'device_id': device.device_id,
-                    'model_name': device.model_name,
-                    'smp': proc,
-                    'mem': mem,
-                })
+        for device_id in device_ids:
+            device = device_map.get(device_id)
+            if device is None:
+                continue
+            proc = device.processing_units
+            mem = BinarySize(device.memory_size)
+            attached_devices.append({  # TODO: update common.types.DeviceModelInfo
+                'device_id': device.device_id,
+                'model_name': device.model_name,
+                'smp': proc,
+                'mem': mem,
+            })
         return attached_devices
 
     async def restore_from_container(
@@ -394,22 +633,17 @@ class CUDAPlugin(AbstractComputePlugin):
         resource_spec = await get_resource_spec_from_container(container.backend_obj)
         if resource_spec is None:
             return
-        if hasattr(alloc_map, 'apply_allocation'):
+        cuda_alloc = resource_spec.allocations.get(
+            _DEV_CUDA, {}
+        ).get(
+            _SLOT_CUDA_DEVICE, {}
+        )
+        if self._apply_allocation_mode:
             alloc_map.apply_allocation({
-                SlotName('cuda.device'): resource_spec.allocations.get(
-                    DeviceName('cuda'), {}
-                ).get(
-                    SlotName('cuda.device'), {}
-                ),
+                _SLOT_CUDA_DEVICE: cuda_alloc,
             })
         else:
-            alloc_map.allocations[SlotName('cuda.device')].update(
-                resource_spec.allocations.get(
-                    DeviceName('cuda'), {}
-                ).get(
-                    SlotName('cuda.device'), {}
-                )
-            )
+            alloc_map.allocations[_SLOT_CUDA_DEVICE].update(cuda_alloc)
 
     async def generate_resource_data(
         self,
@@ -424,8 +658,19 @@ class CUDAPlugin(AbstractComputePlugin):
             for dev_id, alloc in per_device_alloc.items():
                 if alloc > 0:
                     active_device_id_set.add(dev_id)
-        active_device_ids = sorted(active_device_id_set, key=lambda v: int(v))
+        active_device_ids = [
+            dev_id for _, dev_id in sorted((int(dev_id), dev_id)
+                                           for dev_id in active_device_id_set)
+        ]
         data['CUDA_GLOBAL_DEVICE_IDS'] = ','.join(
             f'{local_idx}:{global_id}'
             for local_idx, global_id in enumerate(active_device_ids))
+        # The NUMA node of each device in the same local index order,
+        # where -1 means that the NUMA node is unknown.
+        device_map = await self._get_device_map()
+        numa_nodes = []
+        for dev_id in active_device_ids:
+            device = device_map.get(dev_id)
+            numa_nodes.append(_format_numa_node(None if device is None else device.numa_node))
+        data['CUDA_NUMA_NODES'] = ','.join(numa_nodes)
         return data